@@ -0,0 +1,172 @@
+"""
+Redis-backed cache for parsed log entries.
+Shared by every worker process and bounded by TTL plus Redis' own eviction
+policy, so parsed uploads no longer pile up in each worker's memory.
+Entries are passed around as columns (one list per LOG_COLUMNS field) and
+stored as one compact JSON array per row.
+"""
+
+import logging
+import uuid
+from itertools import islice
+from typing import Dict, List, Optional, Tuple
+
+import orjson
+import redis
+from django.conf import settings
+
+from .log_parser import (
+    LOG_COLUMNS, entries_to_columns, iter_log_file_lines, iter_parse_log_file, open_log_file,
+)
+from .models import UploadedFile
+
+
+logger = logging.getLogger(__name__)
+
+# Entries pushed to Redis per round trip when caching a file
+PUSH_BATCH_SIZE = 1000
+
+# Seconds a rendered page of the results history stays cached
+RESULTS_PAGE_TTL = 30
+
+# Bumped whenever a job completes; part of every results page key, so old
+# pages are orphaned (and expire) without scanning for them
+_RESULTS_VERSION_KEY = 'results:list:ver'
+
+# One pool per process; clients borrow connections from it per command
+_pool = redis.ConnectionPool.from_url(settings.REDIS_URL)
+
+
+def get_client() -> redis.Redis:
+    """Return a Redis client backed by the shared connection pool."""
+    return redis.Redis(connection_pool=_pool)
+
+
+def _entries_key(file_id: str) -> str:
+    return f'parsed:{file_id}'
+
+
+def get_entries(file_id: str) -> Optional[Dict[str, list]]:
+    """
+    Return all cached entries for a file as columns, or None on a miss.
+    An unreachable Redis is treated as a miss so callers fall back to disk.
+    """
+    try:
+        raw = get_client().lrange(_entries_key(file_id), 0, -1)
+    except redis.RedisError as e:
+        logger.warning(f"Redis unavailable, skipping cache lookup: {e}")
+        return None
+    if not raw:
+        return None
+    rows = map(orjson.loads, raw)
+    return dict(zip(LOG_COLUMNS, map(list, zip(*rows))))
+
+
+def get_page(file_id: str, start: int, end: int) -> Optional[Tuple[List[dict], int]]:
+    """
+    Return entries ``[start, end)`` as row dicts and the total entry count,
+    or None on a miss. Only the requested slice is transferred and decoded.
+    """
+    key = _entries_key(file_id)
+    try:
+        pipe = get_client().pipeline(transaction=False)
+        pipe.lrange(key, start, end - 1)
+        pipe.llen(key)
+        raw, total = pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Redis unavailable, skipping cache lookup: {e}")
+        return None
+    if not total:
+        return None
+    return [dict(zip(LOG_COLUMNS, orjson.loads(item))) for item in raw], total
+
+
+def set_entries(file_id: str, columns: Dict[str, list]) -> None:
+    """
+    Cache the parsed entries for a file for PARSED_CACHE_TTL seconds, one
+    list element per entry so pages can be read with LRANGE.
+    """
+    key = _entries_key(file_id)
+    # Each writer gets its own staging key; concurrent misses on the same
+    # file then each publish a complete list and the last rename wins
+    staging = f'{key}:staging:{uuid.uuid4().hex}'
+    try:
+        client = get_client()
+        # Build the list under a staging key and rename it into place, so
+        # readers never see a partially written list
+        rows = zip(*(columns[name] for name in LOG_COLUMNS))
+        pushed = False
+        while True:
+            batch = list(islice(rows, PUSH_BATCH_SIZE))
+            if not batch:
+                break
+            pipe = client.pipeline(transaction=False)
+            pipe.rpush(staging, *map(orjson.dumps, batch))
+            pipe.expire(staging, settings.PARSED_CACHE_TTL)
+            pipe.execute()
+            pushed = True
+        if pushed:
+            pipe = client.pipeline()
+            pipe.rename(staging, key)
+            pipe.expire(key, settings.PARSED_CACHE_TTL)
+            pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Redis unavailable, entries for {file_id} not cached: {e}")
+
+
+def load_entries(file_id: str) -> Dict[str, list]:
+    """
+    Return a file's parsed entries as columns, from the cache when present.
+    On a miss the stored upload is stream-parsed and the result cached.
+    Raises UploadedFile.DoesNotExist or FileNotFoundError.
+    """
+    columns = get_entries(file_id)
+    if columns is None:
+        uploaded_file = UploadedFile.objects.get(id=file_id)
+        with open_log_file(uploaded_file.file_path) as f:
+            columns = entries_to_columns(iter_parse_log_file(iter_log_file_lines(f)))
+        set_entries(file_id, columns)
+    return columns
+
+
+def results_page_key(page: int, limit: int) -> Optional[str]:
+    """
+    Return the cache key for one page of the results history under the
+    current version, or None when Redis is unreachable.
+    """
+    try:
+        version = get_client().get(_RESULTS_VERSION_KEY)
+    except redis.RedisError as e:
+        logger.warning(f"Redis unavailable, results history not cached: {e}")
+        return None
+    return f'results:list:{int(version or 0)}:{page}:{limit}'
+
+
+def invalidate_results_pages() -> None:
+    """Orphan every cached results page by bumping the version counter."""
+    try:
+        get_client().incr(_RESULTS_VERSION_KEY)
+    except redis.RedisError as e:
+        logger.warning(f"Redis unavailable, results history not invalidated: {e}")
+
+
+def get_json(key: Optional[str]):
+    """Return the decoded JSON value stored at ``key``, or None on a miss."""
+    if key is None:
+        return None
+    try:
+        raw = get_client().get(key)
+    except redis.RedisError as e:
+        logger.warning(f"Redis unavailable, skipping cache lookup: {e}")
+        return None
+    return orjson.loads(raw) if raw is not None else None
+
+
+def set_json(key: Optional[str], value, ttl: int) -> None:
+    """Store ``value`` as JSON at ``key`` for ``ttl`` seconds."""
+    if key is None:
+        return
+    try:
+        get_client().setex(key, ttl, orjson.dumps(value))
+    except redis.RedisError as e:
+        logger.warning(f"Redis unavailable, {key} not cached: {e}")
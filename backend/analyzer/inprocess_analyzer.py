@@ -0,0 +1,107 @@
+"""In-process polars analysis for inputs too small to justify a Spark job."""
+
+from typing import Dict, Any, Optional, Tuple
+
+import pandas as pd
+import polars as pl
+
+from .spark_analyzer import (
+    IPV4_REGEX, LogAnalyzer, LogEntries, entries_to_pandas, expand_status_codes, parse_date_filter,
+    parse_url_pattern,
+)
+
+
+class InProcessLogAnalyzer(LogAnalyzer):
+    """Polars-based log analyzer that runs inside the Celery worker process, without Spark."""
+    
+    def create_dataframe(self, entries: LogEntries) -> pl.DataFrame:
+        """Create polars DataFrame from log entries."""
+        return pl.from_pandas(entries_to_pandas(entries)) \
+            .with_columns(pl.col('timestamp').dt.hour().alias('hour'))
+    
+    def apply_filters(self, df: pl.DataFrame, filters: Dict[str, Any]) -> pl.DataFrame:
+        """Apply filters to DataFrame."""
+        if not filters:
+            return df
+        
+        # Date range filter
+        date_range = filters.get('dateRange', {})
+        if date_range.get('start'):
+            start_dt = parse_date_filter(date_range['start'])
+            if start_dt is not None:
+                df = df.filter(pl.col('timestamp') >= start_dt)
+        
+        if date_range.get('end'):
+            end_dt = parse_date_filter(date_range['end'])
+            if end_dt is not None:
+                df = df.filter(pl.col('timestamp') <= end_dt)
+        
+        # IP address filter
+        ip_pattern = filters.get('ipAddress', '')
+        if ip_pattern:
+            # A complete IPv4 address is an exact match, not a substring scan
+            if IPV4_REGEX.match(ip_pattern):
+                df = df.filter(pl.col('ip') == ip_pattern)
+            else:
+                df = df.filter(pl.col('ip').str.contains(ip_pattern, literal=True))
+        
+        # URL pattern filter
+        url_pattern = filters.get('urlPattern', '')
+        if url_pattern:
+            mode, value = parse_url_pattern(url_pattern)
+            if mode == 'exact':
+                df = df.filter(pl.col('path') == value)
+            elif mode == 'prefix':
+                df = df.filter(pl.col('path').str.starts_with(value))
+            elif mode == 'suffix':
+                df = df.filter(pl.col('path').str.ends_with(value))
+            else:
+                df = df.filter(pl.col('path').str.contains(value, literal=True))
+        
+        # Status codes filter
+        status_codes = filters.get('statusCodes', [])
+        if status_codes:
+            df = df.filter(pl.col('status').is_in(expand_status_codes(status_codes)))
+        
+        # HTTP methods filter
+        methods = filters.get('httpMethods', [])
+        if methods:
+            df = df.filter(pl.col('method').is_in(methods))
+        
+        # Size range filter
+        size_range = filters.get('sizeRange', {})
+        if size_range.get('min'):
+            try:
+                min_size = int(size_range['min'])
+                df = df.filter(pl.col('size') >= min_size)
+            except ValueError:
+                pass
+        
+        if size_range.get('max'):
+            try:
+                max_size = int(size_range['max'])
+                df = df.filter(pl.col('size') <= max_size)
+            except ValueError:
+                pass
+        
+        return df
+    
+    def _totals(self, df: pl.DataFrame) -> Tuple[int, int]:
+        """Return the number of requests and their total bytes."""
+        return df.select(pl.len(), pl.col('size').sum()).row(0)
+    
+    def _aggregate_by(self, df: pl.DataFrame, key: str) -> pl.DataFrame:
+        """Count requests and sum bytes per ``key`` with polars."""
+        return df.lazy() \
+            .group_by(key) \
+            .agg(pl.len().alias('count'), pl.col('size').sum().alias('bytes')) \
+            .collect()
+    
+    def _row_count(self, agg: pl.DataFrame) -> int:
+        return agg.height
+    
+    def _collect(self, agg: pl.DataFrame, top: Optional[int] = None, by: str = 'count') -> pd.DataFrame:
+        """Convert an aggregate to pandas, keeping only the top rows if asked."""
+        if top is not None:
+            agg = agg.top_k(top, by=by)
+        return agg.to_pandas()
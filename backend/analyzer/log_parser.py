@@ -1,14 +1,24 @@
 """Log file parsing utilities supporting multiple formats."""
 
+import csv
+import mmap
+import os
 import re
+import sys
+from functools import lru_cache
 from datetime import datetime
-from typing import List, Dict, Tuple, Optional
+from itertools import chain
+from typing import List, Dict, Tuple, Optional, Iterable, Iterator, BinaryIO
 from dataclasses import dataclass
 
 
 @dataclass
 class ParsedLogEntry:
     """Represents a parsed log entry."""
+    # Explicit slots (dataclass(slots=True) needs Python 3.10) drop the
+    # per-instance __dict__, which dominates memory on large files
+    __slots__ = ('ip', 'timestamp', 'method', 'path', 'protocol', 'status', 'size', 'raw_line')
+    
     ip: str
     timestamp: Optional[datetime]
     method: str
@@ -29,20 +39,60 @@ NGINX_REGEX = re.compile(
     r'^(\S+)\s+-\s+-\s+\[([^\]]+)\]\s+"(\S+)\s+(\S+)\s*(\S*)"\s+(\d+)\s+(\S+)(?:\s+"([^"]*)"\s+"([^"]*)")?(?:\s+(\d+))?'
 )
 
+# Bound match methods, looked up once instead of per line
+_match_combined = APACHE_COMBINED_REGEX.match
+_match_nginx = NGINX_REGEX.match
+
+# Group numbers of ip, timestamp, method, path, protocol, status and size
+_ENTRY_GROUPS = tuple(range(1, 8))
+
+# Loose Apache timestamp pattern for values the fixed-offset parser rejects
+_TS_RE = re.compile(r'(\d+)/(\w+)/(\d+):(\d+):(\d+):(\d+)\s*([+-]\d+)?')
+
 # Month mapping for Apache date format
 MONTH_MAP = {
     'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
     'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12
 }
 
+# Column order shared with the Spark schema
+LOG_COLUMNS = ['ip', 'timestamp', 'method', 'path', 'protocol', 'status', 'size']
+
+# Window decoded at a time when re-parsing stored uploads
+READ_BUFFER_SIZE = 1 << 20
+
+# Distinct timestamp strings memoized by the parsers; large enough to hold
+# most of a day at one-second resolution, since logs repeat each second
+TIMESTAMP_CACHE_SIZE = 65536
+
 # CSV header keywords for auto-detection
 CSV_HEADER_KEYWORDS = ['ip', 'address', 'timestamp', 'date', 'method', 'url', 'path', 'status', 'size', 'bytes']
 
+# All header keywords as one alternation, scanned in a single pass
+CSV_HEADER_REGEX = re.compile('|'.join(map(re.escape, CSV_HEADER_KEYWORDS)), re.IGNORECASE)
+
 
+@lru_cache(maxsize=TIMESTAMP_CACHE_SIZE)
 def parse_apache_timestamp(timestamp_str: str) -> Optional[datetime]:
-    """Parse Apache log timestamp format: 15/Jul/2009:14:58:59 -0700"""
+    """
+    Parse Apache log timestamp format: 15/Jul/2009:14:58:59 -0700
+    Cached, since concurrent requests repeat the same second many times.
+    """
     try:
-        match = re.match(r'(\d+)/(\w+)/(\d+):(\d+):(\d+):(\d+)\s*([+-]\d+)?', timestamp_str)
+        # Fast path: the canonical format is fixed-width, so slice it directly
+        ts = timestamp_str
+        if ts[2] == '/' and ts[6] == '/' and ts[11] == ':' and ts[14] == ':' and ts[17] == ':':
+            month_num = MONTH_MAP.get(ts[3:6])
+            if month_num:
+                return datetime(
+                    int(ts[7:11]), month_num, int(ts[0:2]),
+                    int(ts[12:14]), int(ts[15:17]), int(ts[18:20])
+                )
+    except (ValueError, IndexError):
+        pass
+    
+    try:
+        match = _TS_RE.match(timestamp_str)
         if match:
             day, month, year, hour, minute, second, tz = match.groups()
             month_num = MONTH_MAP.get(month, 1)
@@ -55,43 +105,42 @@ def parse_apache_timestamp(timestamp_str: str) -> Optional[datetime]:
     return None
 
 
-def parse_log_line(line: str) -> Optional[ParsedLogEntry]:
-    """Parse a single log line using multiple format patterns."""
-    line = line.strip()
-    if not line:
-        return None
+@lru_cache(maxsize=TIMESTAMP_CACHE_SIZE)
+def parse_csv_timestamp(timestamp_str: str) -> Optional[datetime]:
+    """Parse an ISO 8601 CSV timestamp, falling back to the Apache format."""
+    try:
+        return datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
+    except ValueError:
+        return parse_apache_timestamp(timestamp_str)
+
+
+def _entry_from_match(match: re.Match, line: str) -> Optional[ParsedLogEntry]:
+    """Build a ParsedLogEntry from a combined/Nginx pattern match."""
+    # One C-level call for exactly the seven groups used; the pattern also
+    # captures referrer, user-agent and response time, which are ignored
+    ip, timestamp_str, method, path, protocol, status, size = match.group(*_ENTRY_GROUPS)
     
-    # Try Apache/Nginx combined format
-    for pattern in [APACHE_COMBINED_REGEX, NGINX_REGEX]:
-        match = pattern.match(line)
-        if match:
-            ip, timestamp_str, method, path, protocol, status, size = match.groups()
-            
-            # Parse size, handling '-' for missing values
-            parsed_size = 0 if size == '-' else int(size) if size.isdigit() else 0
-            
-            # Skip entries with size '-' (304 responses, etc.) as per requirements
-            if size == '-':
-                return None
-            
-            return ParsedLogEntry(
-                ip=ip,
-                timestamp=parse_apache_timestamp(timestamp_str),
-                method=method or 'GET',
-                path=path or '/',
-                protocol=protocol or 'HTTP/1.1',
-                status=int(status) if status.isdigit() else 0,
-                size=parsed_size,
-                raw_line=line
-            )
+    # Skip entries with size '-' (304 responses, etc.) as per requirements
+    if size == '-':
+        return None
     
-    return None
+    # IPs, methods and protocols repeat across millions of lines; intern them
+    # so every entry shares one string object per distinct value
+    return ParsedLogEntry(
+        ip=sys.intern(ip),
+        timestamp=parse_apache_timestamp(timestamp_str),
+        method=sys.intern(method) if method else 'GET',
+        path=path or '/',
+        protocol=sys.intern(protocol) if protocol else 'HTTP/1.1',
+        status=int(status),  # always digits: the pattern captures it with \d+
+        size=int(size) if size.isdigit() else 0,
+        raw_line=line
+    )
 
 
 def detect_csv_format(first_line: str) -> bool:
     """Detect if the file is in CSV format."""
-    lower_line = first_line.lower()
-    return any(keyword in lower_line for keyword in CSV_HEADER_KEYWORDS) or ',' in first_line
+    return ',' in first_line or CSV_HEADER_REGEX.search(first_line) is not None
 
 
 def parse_csv_line(values: List[str], field_map: Dict[str, int], line: str) -> Optional[ParsedLogEntry]:
@@ -102,10 +151,7 @@ def parse_csv_line(values: List[str], field_map: Dict[str, int], line: str) -> O
         timestamp = None
         if field_map.get('timestamp', -1) >= 0:
             ts_str = values[field_map['timestamp']]
-            try:
-                timestamp = datetime.fromisoformat(ts_str.replace('Z', '+00:00'))
-            except ValueError:
-                timestamp = parse_apache_timestamp(ts_str)
+            timestamp = parse_csv_timestamp(ts_str)
         
         method = values[field_map.get('method', -1)] if field_map.get('method', -1) >= 0 else 'GET'
         path = values[field_map.get('path', -1)] if field_map.get('path', -1) >= 0 else '/'
@@ -128,9 +174,9 @@ def parse_csv_line(values: List[str], field_map: Dict[str, int], line: str) -> O
             return None
         
         return ParsedLogEntry(
-            ip=ip,
+            ip=sys.intern(ip),
             timestamp=timestamp,
-            method=method,
+            method=sys.intern(method),
             path=path,
             protocol='HTTP/1.1',
             status=status,
@@ -164,65 +210,195 @@ def detect_csv_fields(headers: List[str]) -> Dict[str, int]:
     return field_map
 
 
-def parse_csv_file(lines: List[str]) -> Tuple[List[ParsedLogEntry], List[str]]:
-    """Parse a CSV file."""
-    entries = []
-    errors = []
+class _LineFeeder:
+    """
+    Iterator handing a csv.reader one line per next() call. It reports
+    exhaustion once the line is taken but can be refilled, so the same
+    reader keeps working line after line.
+    """
+    __slots__ = ('line',)
     
-    if not lines:
-        return entries, ['Empty file']
+    def __init__(self):
+        self.line = None
+    
+    def __iter__(self):
+        return self
+    
+    def __next__(self) -> str:
+        line = self.line
+        if line is None:
+            raise StopIteration
+        self.line = None
+        return line
+
+
+def _iter_csv_entries(lines: Iterator[Tuple[int, str]], errors: List[str]) -> Iterator[ParsedLogEntry]:
+    """Parse numbered, stripped CSV lines; the first line is the header."""
+    _, first_line = next(lines)
     
     # Detect delimiter
-    first_line = lines[0]
     delimiter = '\t' if '\t' in first_line else ','
     
     # Parse header
-    headers = [h.strip() for h in first_line.split(delimiter)]
+    headers = next(csv.reader([first_line], delimiter=delimiter))
     field_map = detect_csv_fields(headers)
     
     if 'ip' not in field_map and 'path' not in field_map:
         errors.append('CSV does not contain recognizable log fields (ip, path, status, etc.)')
-        return entries, errors
+        return
     
-    # Parse data rows
-    for i, line in enumerate(lines[1:], start=2):
-        line = line.strip()
-        if not line:
-            continue
-        
-        values = [v.strip().strip('"\'') for v in line.split(delimiter)]
-        entry = parse_csv_line(values, field_map, line)
+    # Parse data rows. One reader is fed a single line at a time, so an
+    # unclosed quote ends at its own line instead of swallowing the next
+    # ones; after a csv.Error (e.g. an oversized field) it is replaced
+    feeder = _LineFeeder()
+    reader = csv.reader(feeder, delimiter=delimiter)
+    for i, line in lines:
+        feeder.line = line
+        try:
+            values = next(reader)
+        except csv.Error:
+            reader = csv.reader(feeder, delimiter=delimiter)
+            entry = None
+        else:
+            # Padding around values is not part of them, on either side
+            entry = parse_csv_line([v.strip() for v in values], field_map, line)
         
         if entry:
-            entries.append(entry)
+            yield entry
         else:
             errors.append(f'Line {i}: Unable to parse - "{line[:60]}..."')
-    
-    return entries, errors
 
 
-def parse_log_file(content: str) -> Tuple[List[ParsedLogEntry], List[str]]:
+def iter_parse_log_file(lines: Iterable[str], errors: Optional[List[str]] = None) -> Iterator[ParsedLogEntry]:
     """
-    Parse log file content and return entries and errors.
-    Supports Apache, Nginx, and CSV formats.
+    Lazily parse log lines from any iterable of lines, such as an open text
+    file, holding only one batch of lines in memory at a time.
+    Unparseable lines are reported into ``errors`` when a list is given.
     """
-    lines = [line for line in content.split('\n') if line.strip()]
-    entries = []
-    errors = []
+    if errors is None:
+        errors = []
+    
+    stripped = (line.strip() for line in lines)
+    numbered = enumerate((line for line in stripped if line), start=1)
     
-    if not lines:
-        return entries, ['Empty file']
+    first = next(numbered, None)
+    if first is None:
+        errors.append('Empty file')
+        return
+    numbered = chain([first], numbered)
     
     # Detect format
-    if detect_csv_format(lines[0]):
-        return parse_csv_file(lines)
+    if detect_csv_format(first[1]):
+        yield from _iter_csv_entries(numbered, errors)
+        return
     
-    # Parse as standard log format
-    for i, line in enumerate(lines, start=1):
-        entry = parse_log_line(line)
+    # Parse as standard log format. Both patterns require a bracketed
+    # timestamp and a quoted request line, so two substring scans reject
+    # garbage lines before any regex runs.
+    for i, line in numbered:
+        match = None
+        if '[' in line and '"' in line:
+            match = _match_combined(line) or _match_nginx(line)
+        entry = _entry_from_match(match, line) if match else None
         if entry:
-            entries.append(entry)
+            yield entry
         else:
             errors.append(f'Line {i}: Unable to parse - "{line[:60]}..."')
-    
-    return entries, errors
+
+
+def decode_log_bytes(data: bytes) -> str:
+    """Decode log bytes as UTF-8, falling back to latin-1 for anything else."""
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        return data.decode('latin-1')
+
+
+def _decode_lines(data: bytes) -> List[str]:
+    """
+    Decode newline-separated log bytes into lines, each one independently
+    of its neighbours: one invalid byte only makes its own line latin-1.
+    """
+    try:
+        # No multi-byte UTF-8 sequence contains b'\n', so if the whole block
+        # decodes, every line in it decodes the same way on its own
+        return data.decode('utf-8').split('\n')
+    except UnicodeDecodeError:
+        return [decode_log_bytes(line) for line in data.split(b'\n')]
+
+
+def iter_chunk_lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    """
+    Split a stream of byte chunks into decoded lines. Partial lines are
+    carried over, so only one chunk is held in memory at a time. Each line
+    is decoded on its own with decode_log_bytes, so the text never depends
+    on where the chunk boundaries fall.
+    """
+    # The unfinished line is kept as a list of pieces and joined only once
+    # a newline completes it, so a long line is never re-copied or re-scanned
+    pieces = []
+    for chunk in chunks:
+        end = chunk.rfind(b'\n') + 1
+        if not end:
+            pieces.append(chunk)
+            continue
+        pieces.append(chunk[:end - 1])
+        yield from _decode_lines(b''.join(pieces))
+        pieces = [chunk[end:]]
+    tail = b''.join(pieces)
+    if tail:
+        yield decode_log_bytes(tail)
+
+
+def entries_to_columns(entries: Iterable[ParsedLogEntry]) -> Dict[str, list]:
+    """
+    Collect parsed entries into one list per LOG_COLUMNS field instead of a
+    dict per row; rows are only built for the slice a caller returns.
+    """
+    columns = {name: [] for name in LOG_COLUMNS}
+    add_ip, add_ts, add_method, add_path, add_protocol, add_status, add_size = (
+        columns[name].append for name in LOG_COLUMNS
+    )
+    for e in entries:
+        add_ip(e.ip)
+        add_ts(e.timestamp)
+        add_method(e.method)
+        add_path(e.path)
+        add_protocol(e.protocol)
+        add_status(e.status)
+        add_size(e.size)
+    return columns
+
+
+def columns_to_rows(columns: Dict[str, list], start: int = 0, end: Optional[int] = None) -> List[dict]:
+    """Build row dicts for ``columns[start:end]``."""
+    names = list(columns)
+    return [dict(zip(names, values)) for values in zip(*(col[start:end] for col in columns.values()))]
+
+
+def open_log_file(path: str) -> BinaryIO:
+    """
+    Open a stored log file for sequential parsing. Uploads are stored as
+    the original bytes, so the file is opened in binary mode and decoded by
+    the caller; where supported, the kernel is asked for aggressive
+    read-ahead.
+    """
+    f = open(path, 'rb')
+    if hasattr(os, 'posix_fadvise'):
+        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+    return f
+
+
+def iter_log_file_lines(f: BinaryIO) -> Iterator[str]:
+    """
+    Yield decoded lines from a file opened with open_log_file. The file is
+    memory-mapped and decoded a window at a time, so its bytes are read
+    straight from the page cache rather than through a read buffer.
+    """
+    if os.fstat(f.fileno()).st_size == 0:
+        return  # empty files cannot be mapped
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if hasattr(mm, 'madvise'):
+            mm.madvise(mmap.MADV_SEQUENTIAL)
+        windows = (mm[i:i + READ_BUFFER_SIZE] for i in range(0, len(mm), READ_BUFFER_SIZE))
+        yield from iter_chunk_lines(windows)
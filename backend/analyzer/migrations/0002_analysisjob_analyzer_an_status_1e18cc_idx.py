@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-15 09:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='analysisjob',
+            index=models.Index(fields=['status', '-created_at'], name='analyzer_an_status_1e18cc_idx'),
+        ),
+    ]
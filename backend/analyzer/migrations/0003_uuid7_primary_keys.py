@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-15 09:50
+
+import analyzer.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0002_analysisjob_analyzer_an_status_1e18cc_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='analysisjob',
+            name='id',
+            field=models.UUIDField(default=analyzer.models.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='analysisresult',
+            name='id',
+            field=models.UUIDField(default=analyzer.models.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='uploadedfile',
+            name='id',
+            field=models.UUIDField(default=analyzer.models.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+    ]
@@ -1,12 +1,27 @@
 """Database models for storing analysis history."""
 
 from django.db import models
+import os
+import time
 import uuid
 
 
+def uuid7() -> uuid.UUID:
+    """
+    Generate a time-ordered UUID (RFC 9562 version 7): a 48-bit millisecond
+    timestamp followed by random bits. New primary keys sort after existing
+    ones, so inserts append to the right edge of the index instead of
+    landing on random pages.
+    """
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), 'big')
+    value = value & ~(0xF << 76) | 0x7 << 76  # version 7
+    value = value & ~(0x3 << 62) | 0x2 << 62  # RFC 4122 variant
+    return uuid.UUID(int=value)
+
+
 class UploadedFile(models.Model):
     """Stores uploaded log file metadata."""
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     filename = models.CharField(max_length=255)
     file_path = models.CharField(max_length=500)
     file_size = models.BigIntegerField()
@@ -28,7 +43,7 @@ class AnalysisJob(models.Model):
         ('failed', 'Failed'),
     ]
     
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     uploaded_file = models.ForeignKey(UploadedFile, on_delete=models.CASCADE, related_name='jobs')
     selected_analyses = models.JSONField()  # List of analysis types
     filters = models.JSONField(default=dict)  # Applied filters
@@ -42,11 +57,13 @@ class AnalysisJob(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        # Serves the history listing: completed jobs, newest first
+        indexes = [models.Index(fields=['status', '-created_at'])]
 
 
 class AnalysisResult(models.Model):
     """Stores individual analysis results."""
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     job = models.ForeignKey(AnalysisJob, on_delete=models.CASCADE, related_name='results')
     analysis_type = models.CharField(max_length=50)
     result_data = models.JSONField()
@@ -2,83 +2,351 @@
 
 from pyspark.sql import SparkSession
 from pyspark.sql import functions as F
-from pyspark.sql.types import StructType, StructField, StringType, IntegerType, TimestampType
-from typing import Dict, List, Any, Optional
+from pyspark.sql.types import StructType, StructField, StringType, ShortType, LongType, TimestampType
+from typing import Dict, List, Any, Optional, Tuple, Union
 from datetime import datetime
-import json
+import atexit
+import csv
 import os
+import re
+import threading
+
+import orjson
+import pandas as pd
 
 from django.conf import settings
 
+from .log_parser import parse_csv_timestamp
+
 
-# Schema for log entries
+# Schema for log entries; status codes fit in 16 bits, which halves the
+# bytes the status group-bys and filters have to move. Sizes stay 64-bit,
+# since a single response can exceed 2 GiB
 LOG_SCHEMA = StructType([
     StructField("ip", StringType(), True),
     StructField("timestamp", TimestampType(), True),
     StructField("method", StringType(), True),
     StructField("path", StringType(), True),
     StructField("protocol", StringType(), True),
-    StructField("status", IntegerType(), True),
-    StructField("size", IntegerType(), True),
+    StructField("status", ShortType(), True),
+    StructField("size", LongType(), True),
 ])
 
+# A complete dotted-quad IPv4 address
+IPV4_REGEX = re.compile(r'^\d{1,3}(?:\.\d{1,3}){3}$')
 
-class SparkLogAnalyzer:
-    """Spark-based log analyzer for large-scale processing."""
+
+def _to_timestamp(value: Any) -> Optional[datetime]:
+    """
+    Convert a timestamp (or a cached ISO string) to a naive datetime. An
+    offset is dropped and the wall-clock time kept, as Apache timestamps
+    are parsed, so one column never mixes naive and tz-aware values.
+    """
+    if isinstance(value, str):
+        value = parse_csv_timestamp(value)
+    if value is not None and value.tzinfo is not None:
+        value = value.replace(tzinfo=None)
+    return value
+
+
+def parse_date_filter(value: str) -> Optional[datetime]:
+    """Parse a dateRange bound into the naive form timestamps are stored in."""
+    return _to_timestamp(value)
+
+
+def parse_url_pattern(pattern: str) -> Tuple[str, str]:
+    """
+    Split a URL filter into a match mode and value: '^/api$' matches exactly,
+    '^/api' and '/api*' as a prefix, '.css$' as a suffix, anything else as
+    a substring.
+    """
+    if pattern.startswith('^') and pattern.endswith('$') and len(pattern) > 2:
+        return 'exact', pattern[1:-1]
+    if pattern.startswith('^') and len(pattern) > 1:
+        return 'prefix', pattern[1:]
+    if pattern.endswith('*') and len(pattern) > 1:
+        return 'prefix', pattern[:-1]
+    if pattern.endswith('$') and len(pattern) > 1:
+        return 'suffix', pattern[:-1]
+    return 'contains', pattern
+
+
+def expand_status_codes(status_codes: List[int]) -> List[int]:
+    """
+    Expand a status code filter into the exact codes it matches. Group
+    codes (200, 300, 400, 500) stand for their whole class, e.g. 200-299.
+    """
+    expanded = set()
+    for code in status_codes:
+        if code in (200, 300, 400, 500):
+            expanded.update(range(code, code + 100))
+        else:
+            expanded.add(code)
+    return sorted(expanded)
+
+
+# Log entries as accepted by the analyzers: row dicts or columns (one list
+# per field, as produced by entries_to_columns)
+LogEntries = Union[List[Dict[str, Any]], Dict[str, List[Any]]]
+
+
+def count_entries(entries: LogEntries) -> int:
+    """Return the number of log entries in any LogEntries shape."""
+    if isinstance(entries, dict):
+        return len(entries['ip'])
+    return len(entries)
+
+
+def entries_to_pandas(entries: LogEntries) -> pd.DataFrame:
+    """Build a columnar pandas frame in LOG_SCHEMA order from log entries."""
+    if isinstance(entries, dict):
+        pdf = pd.DataFrame(entries, columns=LOG_SCHEMA.fieldNames())
+    else:
+        pdf = pd.DataFrame.from_records(entries, columns=LOG_SCHEMA.fieldNames())
+    pdf = pdf.fillna({
+        'ip': 'unknown',
+        'method': 'GET',
+        'path': '/',
+        'protocol': 'HTTP/1.1',
+        'status': 0,
+        'size': 0,
+    })
+    # Only object columns (cached ISO strings, mixed offsets) need per-value
+    # conversion; datetime columns are converted vectorized. to_datetime
+    # keeps the column datetime-typed even when no row has a timestamp
+    # (e.g. a CSV without a time column), so hour() still works
+    timestamps = pdf['timestamp']
+    if timestamps.dtype == object:
+        timestamps = timestamps.map(_to_timestamp, na_action='ignore')
+    timestamps = pd.to_datetime(timestamps)
+    if timestamps.dt.tz is not None:
+        timestamps = timestamps.dt.tz_localize(None)
+    pdf['timestamp'] = timestamps
+    # Anything outside 0-999 is not an HTTP status; map it to 0 like other
+    # unparseable codes rather than letting int16 wrap it
+    status = pdf['status']
+    pdf['status'] = status.where(status.between(0, 999), 0).astype('int16')
+    pdf['size'] = pdf['size'].astype('int64')
+    
+    return pdf
+
+
+class FilteredLogs:
+    """
+    The filtered DataFrame of one run_analyses call, with its request and
+    byte totals computed once and shared by every analysis. Per-key
+    aggregates are kept here too, so analyses that group by the same key
+    (top pages and bandwidth both use path) share one aggregation.
+    """
     
-    def __init__(self):
-        self.spark = None
-    
-    def _get_or_create_spark(self) -> SparkSession:
-        """Get or create Spark session."""
-        if self.spark is None:
-            self.spark = SparkSession.builder \
-                .appName(settings.SPARK_APP_NAME) \
-                .master(settings.SPARK_MASTER) \
-                .config("spark.driver.memory", "2g") \
-                .config("spark.executor.memory", "2g") \
-                .config("spark.sql.shuffle.partitions", "4") \
-                .getOrCreate()
+    def __init__(self, df, total_requests: int, total_bytes: int):
+        self.df = df
+        self.total_requests = total_requests
+        self.total_bytes = total_bytes
+        self.by_key: Dict[str, Any] = {}
+
+
+class LogAnalyzer:
+    """
+    Base log analyzer. Subclasses load entries into their engine's DataFrame
+    and filter it; the selected analyses then share one per-key aggregate
+    (requests and bytes per ip, path, hour or status) for each key they
+    need, and only top-K lists and small rollups ever leave the engine.
+    """
+    
+    def create_dataframe(self, entries: LogEntries):
+        """
+        Create an engine DataFrame from log entries, with an extra hour
+        column holding the hour of day of each timestamp.
+        """
+        raise NotImplementedError
+    
+    def apply_filters(self, df, filters: Dict[str, Any]):
+        """Apply filters to DataFrame."""
+        raise NotImplementedError
+    
+    def _persist(self, df):
+        """Keep a DataFrame around for the analyses that scan it."""
+        return df
+    
+    def _release(self, df) -> None:
+        """Drop whatever _persist kept."""
+    
+    def _totals(self, df) -> Tuple[int, int]:
+        """Return the number of requests and their total bytes."""
+        raise NotImplementedError
+    
+    def _aggregate_by(self, df, key: str):
+        """
+        Return an engine DataFrame with one row per ``key`` value and
+        columns key, count (requests) and bytes.
+        """
+        raise NotImplementedError
+    
+    def _row_count(self, agg) -> int:
+        """Return the number of rows of an aggregate."""
+        raise NotImplementedError
+    
+    def _collect(self, agg, top: Optional[int] = None, by: str = 'count') -> pd.DataFrame:
+        """
+        Collect an aggregate into pandas. With ``top``, only the ``top`` rows
+        with the largest ``by`` are selected, inside the engine.
+        """
+        raise NotImplementedError
+    
+    def _key_totals(self, logs: FilteredLogs, key: str):
+        """Return the per-key aggregate for ``key``, computing it once per run."""
+        if key not in logs.by_key:
+            logs.by_key[key] = self._persist(self._aggregate_by(logs.df, key))
+        return logs.by_key[key]
+    
+    def unique_ip_counter(self, logs: FilteredLogs) -> Dict[str, Any]:
+        """P1: Count unique IP addresses and rank by frequency."""
+        by_ip = self._key_totals(logs, 'ip')
+        top_ips = self._collect(by_ip, top=10)
+        
+        return {
+            'count': self._row_count(by_ip),
+            'topIps': [{'ip': ip, 'count': int(count)} for ip, count in zip(top_ips['ip'], top_ips['count'])]
+        }
+    
+    def top_pages_counter(self, logs: FilteredLogs) -> List[Dict[str, Any]]:
+        """P2: Count top requested pages."""
+        top_pages = self._collect(self._key_totals(logs, 'path'), top=20)
+        
+        return [{'path': path, 'count': int(count)} for path, count in zip(top_pages['path'], top_pages['count'])]
+    
+    def hourly_traffic_counter(self, logs: FilteredLogs) -> List[Dict[str, Any]]:
+        """P3: Count traffic by hour of day."""
+        # Rows without a timestamp have a null hour and are left out
+        hourly = self._collect(self._key_totals(logs, 'hour')).dropna(subset=['hour'])
+        
+        # Create full 24-hour result
+        hour_counts = {int(hour): int(count) for hour, count in zip(hourly['hour'], hourly['count'])}
+        return [{'hour': h, 'count': hour_counts.get(h, 0)} for h in range(24)]
+    
+    def status_code_distribution(self, logs: FilteredLogs) -> List[Dict[str, Any]]:
+        """P4: Distribution of HTTP status codes."""
+        status_dist = self._collect(self._key_totals(logs, 'status')).sort_values('status')
+        
+        return [{'status': int(code), 'count': int(count)} for code, count in zip(status_dist['status'], status_dist['count'])]
+    
+    def bandwidth_aggregator(self, logs: FilteredLogs) -> Dict[str, Any]:
+        """P5: Aggregate bandwidth usage."""
+        # Total and average size, from the totals run_analyses already has
+        total_requests, total_bytes = logs.total_requests, logs.total_bytes
+        avg_size = total_bytes / total_requests if total_requests else 0.0
+        
+        # Top paths by bandwidth
+        top_paths = self._collect(self._key_totals(logs, 'path'), top=10, by='bytes')
+        
+        return {
+            'totalBytes': total_bytes,
+            'avgSize': avg_size,
+            'byPath': [{'path': path, 'bytes': int(size)} for path, size in zip(top_paths['path'], top_paths['bytes'])]
+        }
+    
+    def run_analyses(
+        self,
+        entries: LogEntries,
+        selected_analyses: List[str],
+        filters: Optional[Dict[str, Any]] = None,
+        progress_callback=None
+    ) -> Dict[str, Any]:
+        """Run selected analyses on log entries."""
+        
+        # Create DataFrame
+        df = self.create_dataframe(entries)
+        original_count = count_entries(entries)
+        
+        # Apply filters
+        if filters:
+            df = self.apply_filters(df, filters)
+        
+        df = self._persist(df)
+        logs = None
+        try:
+            # One pass for the totals; analyses reuse them instead of rescanning
+            logs = FilteredLogs(df, *self._totals(df))
+            
+            results = {
+                'timestamp': datetime.now().isoformat(),
+                'totalRecords': original_count,
+                'filteredRecords': logs.total_requests,
+                'analyses': {}
+            }
             
-            # Set log level to reduce noise
-            self.spark.sparkContext.setLogLevel("WARN")
+            analysis_map = {
+                'unique-ips': ('uniqueIps', self.unique_ip_counter),
+                'top-pages': ('topPages', self.top_pages_counter),
+                'hourly-traffic': ('hourlyTraffic', self.hourly_traffic_counter),
+                'status-codes': ('statusCodes', self.status_code_distribution),
+                'bandwidth': ('bandwidth', self.bandwidth_aggregator),
+            }
+            
+            total = len(selected_analyses)
+            for i, analysis_id in enumerate(selected_analyses):
+                if analysis_id in analysis_map:
+                    key, func = analysis_map[analysis_id]
+                    results['analyses'][key] = func(logs)
+                    
+                    if progress_callback:
+                        progress_callback(int((i + 1) / total * 100))
+        finally:
+            if logs is not None:
+                for agg in logs.by_key.values():
+                    self._release(agg)
+            self._release(df)
+        
+        return results
+
+
+class SparkLogAnalyzer(LogAnalyzer):
+    """Spark-based log analyzer for large-scale processing."""
+    
+    # One session per process, shared by every analyzer instance so the JVM
+    # is started once and stays warm across requests
+    _spark: Optional[SparkSession] = None
+    _spark_lock = threading.Lock()
+    
+    @classmethod
+    def _get_or_create_spark(cls) -> SparkSession:
+        """Get or create the shared Spark session."""
+        with cls._spark_lock:
+            if cls._spark is None:
+                cls._spark = SparkSession.builder \
+                    .appName(settings.SPARK_APP_NAME) \
+                    .master(settings.SPARK_MASTER) \
+                    .config("spark.driver.memory", "2g") \
+                    .config("spark.executor.memory", "2g") \
+                    .config("spark.sql.shuffle.partitions", "4") \
+                    .config("spark.sql.execution.arrow.pyspark.enabled", "true") \
+                    .getOrCreate()
+                
+                # Set log level to reduce noise
+                cls._spark.sparkContext.setLogLevel("WARN")
+                
+                # Stop the session with the worker process, not per request
+                atexit.register(cls.stop_spark)
         
-        return self.spark
+        return cls._spark
     
-    def stop(self):
-        """Stop Spark session."""
-        if self.spark:
-            self.spark.stop()
-            self.spark = None
+    @classmethod
+    def stop_spark(cls):
+        """Stop the shared Spark session."""
+        with cls._spark_lock:
+            if cls._spark is not None:
+                cls._spark.stop()
+                cls._spark = None
     
-    def create_dataframe(self, entries: List[Dict[str, Any]]):
+    def create_dataframe(self, entries: LogEntries):
         """Create Spark DataFrame from log entries."""
         spark = self._get_or_create_spark()
         
-        # Convert entries to Spark-compatible format
-        data = []
-        for entry in entries:
-            timestamp = None
-            if entry.get('timestamp'):
-                try:
-                    if isinstance(entry['timestamp'], str):
-                        timestamp = datetime.fromisoformat(entry['timestamp'].replace('Z', '+00:00'))
-                    else:
-                        timestamp = entry['timestamp']
-                except (ValueError, TypeError):
-                    pass
-            
-            data.append((
-                entry.get('ip', 'unknown'),
-                timestamp,
-                entry.get('method', 'GET'),
-                entry.get('path', '/'),
-                entry.get('protocol', 'HTTP/1.1'),
-                entry.get('status', 0),
-                entry.get('size', 0),
-            ))
-        
-        return spark.createDataFrame(data, LOG_SCHEMA)
+        # Arrow ships the pandas columns to the JVM as contiguous buffers
+        # instead of pickling a list of row tuples
+        return spark.createDataFrame(entries_to_pandas(entries), LOG_SCHEMA) \
+            .withColumn('hour', F.hour('timestamp'))
     
     def apply_filters(self, df, filters: Dict[str, Any]):
         """Apply filters to DataFrame."""
@@ -88,48 +356,41 @@ class SparkLogAnalyzer:
         # Date range filter
         date_range = filters.get('dateRange', {})
         if date_range.get('start'):
-            try:
-                start_dt = datetime.fromisoformat(date_range['start'])
+            start_dt = parse_date_filter(date_range['start'])
+            if start_dt is not None:
                 df = df.filter(F.col('timestamp') >= start_dt)
-            except ValueError:
-                pass
         
         if date_range.get('end'):
-            try:
-                end_dt = datetime.fromisoformat(date_range['end'])
+            end_dt = parse_date_filter(date_range['end'])
+            if end_dt is not None:
                 df = df.filter(F.col('timestamp') <= end_dt)
-            except ValueError:
-                pass
         
         # IP address filter
         ip_pattern = filters.get('ipAddress', '')
         if ip_pattern:
-            df = df.filter(F.col('ip').contains(ip_pattern))
+            # A complete IPv4 address is an exact match, not a substring scan
+            if IPV4_REGEX.match(ip_pattern):
+                df = df.filter(F.col('ip') == ip_pattern)
+            else:
+                df = df.filter(F.col('ip').contains(ip_pattern))
         
         # URL pattern filter
         url_pattern = filters.get('urlPattern', '')
         if url_pattern:
-            df = df.filter(F.col('path').contains(url_pattern))
+            mode, value = parse_url_pattern(url_pattern)
+            if mode == 'exact':
+                df = df.filter(F.col('path') == value)
+            elif mode == 'prefix':
+                df = df.filter(F.col('path').startswith(value))
+            elif mode == 'suffix':
+                df = df.filter(F.col('path').endswith(value))
+            else:
+                df = df.filter(F.col('path').contains(value))
         
         # Status codes filter
         status_codes = filters.get('statusCodes', [])
         if status_codes:
-            # Handle both exact codes and code groups (200, 300, 400, 500)
-            conditions = []
-            for code in status_codes:
-                if code in [200, 300, 400, 500]:
-                    # It's a group code, match the range
-                    conditions.append(
-                        (F.col('status') >= code) & (F.col('status') < code + 100)
-                    )
-                else:
-                    conditions.append(F.col('status') == code)
-            
-            if conditions:
-                combined = conditions[0]
-                for cond in conditions[1:]:
-                    combined = combined | cond
-                df = df.filter(combined)
+            df = df.filter(F.col('status').isin(expand_status_codes(status_codes)))
         
         # HTTP methods filter
         methods = filters.get('httpMethods', [])
@@ -154,130 +415,55 @@ class SparkLogAnalyzer:
         
         return df
     
-    def unique_ip_counter(self, df) -> Dict[str, Any]:
-        """P1: Count unique IP addresses and rank by frequency."""
-        # Count unique IPs
-        unique_count = df.select('ip').distinct().count()
-        
-        # Top IPs by request count
-        top_ips = df.groupBy('ip') \
-            .count() \
-            .orderBy(F.desc('count')) \
-            .limit(10) \
-            .collect()
-        
-        return {
-            'count': unique_count,
-            'topIps': [{'ip': row['ip'], 'count': row['count']} for row in top_ips]
-        }
+    def _persist(self, df):
+        """Cache a DataFrame, since the analyses scan it more than once."""
+        return df.cache()
     
-    def top_pages_counter(self, df) -> List[Dict[str, Any]]:
-        """P2: Count top requested pages."""
-        top_pages = df.groupBy('path') \
-            .count() \
-            .orderBy(F.desc('count')) \
-            .limit(20) \
-            .collect()
-        
-        return [{'path': row['path'], 'count': row['count']} for row in top_pages]
+    def _release(self, df) -> None:
+        df.unpersist()
     
-    def hourly_traffic_counter(self, df) -> List[Dict[str, Any]]:
-        """P3: Count traffic by hour of day."""
-        # Extract hour from timestamp
-        hourly = df.filter(F.col('timestamp').isNotNull()) \
-            .withColumn('hour', F.hour('timestamp')) \
-            .groupBy('hour') \
-            .count() \
-            .orderBy('hour') \
-            .collect()
-        
-        # Create full 24-hour result
-        hour_counts = {row['hour']: row['count'] for row in hourly}
-        return [{'hour': h, 'count': hour_counts.get(h, 0)} for h in range(24)]
+    def _totals(self, df) -> Tuple[int, int]:
+        """Return the number of requests and their total bytes."""
+        row = df.agg(F.count('*').alias('count'), F.sum('size').alias('bytes')).first()
+        return row['count'], row['bytes'] or 0
     
-    def status_code_distribution(self, df) -> List[Dict[str, Any]]:
-        """P4: Distribution of HTTP status codes."""
-        status_dist = df.groupBy('status') \
-            .count() \
-            .orderBy('status') \
-            .collect()
-        
-        return [{'status': row['status'], 'count': row['count']} for row in status_dist]
+    def _aggregate_by(self, df, key: str):
+        """Count requests and sum bytes per ``key``; evaluated lazily."""
+        return df.groupBy(key).agg(F.count('*').alias('count'), F.sum('size').alias('bytes'))
     
-    def bandwidth_aggregator(self, df) -> Dict[str, Any]:
-        """P5: Aggregate bandwidth usage."""
-        # Total and average size
-        size_stats = df.agg(
-            F.sum('size').alias('total'),
-            F.avg('size').alias('avg')
-        ).collect()[0]
-        
-        total_bytes = int(size_stats['total'] or 0)
-        avg_size = float(size_stats['avg'] or 0)
-        
-        # Top paths by bandwidth
-        top_paths = df.groupBy('path') \
-            .agg(F.sum('size').alias('bytes')) \
-            .orderBy(F.desc('bytes')) \
-            .limit(10) \
-            .collect()
-        
-        return {
-            'totalBytes': total_bytes,
-            'avgSize': avg_size,
-            'byPath': [{'path': row['path'], 'bytes': int(row['bytes'])} for row in top_paths]
-        }
+    def _row_count(self, agg) -> int:
+        return agg.count()
     
-    def run_analyses(
-        self,
-        entries: List[Dict[str, Any]],
-        selected_analyses: List[str],
-        filters: Optional[Dict[str, Any]] = None,
-        progress_callback=None
-    ) -> Dict[str, Any]:
-        """Run selected analyses on log entries."""
-        
-        # Create DataFrame
-        df = self.create_dataframe(entries)
-        original_count = df.count()
-        
-        # Apply filters
-        if filters:
-            df = self.apply_filters(df, filters)
-        
-        filtered_count = df.count()
-        
-        # Cache for multiple analyses
-        df.cache()
-        
-        results = {
-            'timestamp': datetime.now().isoformat(),
-            'totalRecords': original_count,
-            'filteredRecords': filtered_count,
-            'analyses': {}
-        }
-        
-        analysis_map = {
-            'unique-ips': ('uniqueIps', self.unique_ip_counter),
-            'top-pages': ('topPages', self.top_pages_counter),
-            'hourly-traffic': ('hourlyTraffic', self.hourly_traffic_counter),
-            'status-codes': ('statusCodes', self.status_code_distribution),
-            'bandwidth': ('bandwidth', self.bandwidth_aggregator),
-        }
-        
-        total = len(selected_analyses)
-        for i, analysis_id in enumerate(selected_analyses):
-            if analysis_id in analysis_map:
-                key, func = analysis_map[analysis_id]
-                results['analyses'][key] = func(df)
-                
-                if progress_callback:
-                    progress_callback(int((i + 1) / total * 100))
-        
-        # Uncache
-        df.unpersist()
-        
-        return results
+    def _collect(self, agg, top: Optional[int] = None, by: str = 'count') -> pd.DataFrame:
+        """
+        Collect an aggregate to the driver. Top-K selection runs in Spark,
+        so only ``top`` rows are transferred.
+        """
+        if top is not None:
+            agg = agg.orderBy(F.desc(by)).limit(top)
+        return agg.toPandas()
+
+
+_analyzer: Optional[SparkLogAnalyzer] = None
+
+
+def get_analyzer() -> SparkLogAnalyzer:
+    """
+    Return the process-wide Spark analyzer. Its session is started on first
+    use and stopped at interpreter exit, never after an individual job.
+    """
+    global _analyzer
+    if _analyzer is None:
+        _analyzer = SparkLogAnalyzer()
+    return _analyzer
+
+
+def _write_csv(path, header: List[str], rows) -> None:
+    """Write a header and rows through a buffered csv.writer (quotes as needed)."""
+    with open(path, 'w', newline='', buffering=1 << 20) as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
 
 
 def save_results_to_csv(results: Dict[str, Any], job_id: str) -> Dict[str, str]:
@@ -291,52 +477,50 @@ def save_results_to_csv(results: Dict[str, Any], job_id: str) -> Dict[str, str]:
     # Unique IPs
     if 'uniqueIps' in analyses:
         path = results_dir / 'unique_ips.csv'
-        with open(path, 'w') as f:
-            f.write('ip,count\n')
-            for item in analyses['uniqueIps']['topIps']:
-                f.write(f"{item['ip']},{item['count']}\n")
+        _write_csv(path, ['ip', 'count'], (
+            (item['ip'], item['count']) for item in analyses['uniqueIps']['topIps']
+        ))
         csv_paths['uniqueIps'] = str(path)
     
     # Top Pages
     if 'topPages' in analyses:
         path = results_dir / 'top_pages.csv'
-        with open(path, 'w') as f:
-            f.write('path,count\n')
-            for item in analyses['topPages']:
-                f.write(f"\"{item['path']}\",{item['count']}\n")
+        _write_csv(path, ['path', 'count'], (
+            (item['path'], item['count']) for item in analyses['topPages']
+        ))
         csv_paths['topPages'] = str(path)
     
     # Hourly Traffic
     if 'hourlyTraffic' in analyses:
         path = results_dir / 'hourly_traffic.csv'
-        with open(path, 'w') as f:
-            f.write('hour,count\n')
-            for item in analyses['hourlyTraffic']:
-                f.write(f"{item['hour']},{item['count']}\n")
+        _write_csv(path, ['hour', 'count'], (
+            (item['hour'], item['count']) for item in analyses['hourlyTraffic']
+        ))
         csv_paths['hourlyTraffic'] = str(path)
     
     # Status Codes
     if 'statusCodes' in analyses:
         path = results_dir / 'status_codes.csv'
-        with open(path, 'w') as f:
-            f.write('status,count\n')
-            for item in analyses['statusCodes']:
-                f.write(f"{item['status']},{item['count']}\n")
+        _write_csv(path, ['status', 'count'], (
+            (item['status'], item['count']) for item in analyses['statusCodes']
+        ))
         csv_paths['statusCodes'] = str(path)
     
     # Bandwidth
     if 'bandwidth' in analyses:
         path = results_dir / 'bandwidth.csv'
-        with open(path, 'w') as f:
-            f.write('path,bytes\n')
-            for item in analyses['bandwidth']['byPath']:
-                f.write(f"\"{item['path']}\",{item['bytes']}\n")
+        _write_csv(path, ['path', 'bytes'], (
+            (item['path'], item['bytes']) for item in analyses['bandwidth']['byPath']
+        ))
         csv_paths['bandwidth'] = str(path)
     
     # Save full results as JSON
     json_path = results_dir / 'results.json'
-    with open(json_path, 'w') as f:
-        json.dump(results, f, indent=2)
+    with open(json_path, 'wb') as f:
+        f.write(orjson.dumps(
+            results,
+            option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        ))
     csv_paths['json'] = str(json_path)
     
     return csv_paths
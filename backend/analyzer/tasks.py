@@ -0,0 +1,66 @@
+"""Celery tasks that run analyses outside the request/response cycle."""
+
+from datetime import datetime
+
+from celery import shared_task
+from django.conf import settings
+from django.db import transaction
+
+from .models import AnalysisJob, AnalysisResult
+from .spark_analyzer import get_analyzer, save_results_to_csv
+from .inprocess_analyzer import InProcessLogAnalyzer
+from . import cache
+
+
+@shared_task
+def run_log_analysis(job_id: str) -> None:
+    """
+    Run a queued AnalysisJob and record its results.
+    The worker process keeps its SparkSession between tasks, so only the
+    first large job pays for starting Spark.
+    """
+    job = AnalysisJob.objects.select_related('uploaded_file').get(id=job_id)
+    uploaded_file = job.uploaded_file
+
+    job.status = 'running'
+    job.save(update_fields=['status'])
+
+    try:
+        entries = cache.load_entries(str(uploaded_file.id))
+
+        # Small inputs run in this worker with polars; only large ones pay for a Spark job
+        if uploaded_file.valid_rows >= settings.SPARK_MIN_ROWS:
+            analyzer = get_analyzer()
+        else:
+            analyzer = InProcessLogAnalyzer()
+        results = analyzer.run_analyses(entries, job.selected_analyses, job.filters)
+
+        # Save results to CSV
+        csv_paths = save_results_to_csv(results, str(job.id))
+
+        # Save individual results and mark the job completed in one
+        # transaction; the job only reads as completed once its rows exist
+        with transaction.atomic():
+            AnalysisResult.objects.bulk_create([
+                AnalysisResult(
+                    job=job,
+                    analysis_type=analysis_type,
+                    result_data=result_data,
+                    csv_path=csv_paths.get(analysis_type, '')
+                )
+                for analysis_type, result_data in results['analyses'].items()
+            ], batch_size=100)
+
+            job.status = 'completed'
+            job.progress = 100
+            job.records_processed = results['filteredRecords']
+            job.result_path = csv_paths.get('json', '')
+            job.completed_at = datetime.now()
+            job.save()
+        cache.invalidate_results_pages()
+
+    except Exception as e:
+        job.status = 'failed'
+        job.error_message = str(e)
+        job.save()
+        raise
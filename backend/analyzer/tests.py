@@ -0,0 +1,253 @@
+"""Tests for the analyzer app: parsing, analysis, caching and views."""
+
+import tempfile
+import unittest
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+from . import cache
+from .inprocess_analyzer import InProcessLogAnalyzer
+from .log_parser import (
+    entries_to_columns, iter_chunk_lines, iter_log_file_lines, iter_parse_log_file, open_log_file,
+)
+from .models import AnalysisJob, UploadedFile
+from .spark_analyzer import SparkLogAnalyzer, parse_url_pattern
+from .views import UPLOAD_CHUNK_SIZE
+
+
+ALL_ANALYSES = ['unique-ips', 'top-pages', 'hourly-traffic', 'status-codes', 'bandwidth']
+
+
+def parse_lines(lines):
+    return entries_to_columns(iter_parse_log_file(lines))
+
+
+class InProcessLogAnalyzerTests(SimpleTestCase):
+
+    def test_csv_without_timestamp_column(self):
+        entries = parse_lines([
+            'ip,path,status,size',
+            '10.0.0.1,/a,200,10',
+            '10.0.0.2,/b,404,5',
+        ])
+        results = InProcessLogAnalyzer().run_analyses(entries, ALL_ANALYSES)
+
+        self.assertEqual(results['filteredRecords'], 2)
+        self.assertEqual(sum(h['count'] for h in results['analyses']['hourlyTraffic']), 0)
+        self.assertEqual(results['analyses']['bandwidth']['totalBytes'], 15)
+
+    def test_tz_aware_csv_with_date_filter(self):
+        entries = parse_lines([
+            'timestamp,ip,path,status,size',
+            '2024-01-01T10:00:00Z,10.0.0.1,/a,200,10',
+            '2024-01-02T11:30:00+02:00,10.0.0.2,/b,404,5',
+        ])
+        results = InProcessLogAnalyzer().run_analyses(
+            entries, ['hourly-traffic'], {'dateRange': {'start': '2024-01-02T00:00:00Z'}}
+        )
+
+        # Offsets are dropped and the wall-clock time kept
+        self.assertEqual(results['filteredRecords'], 1)
+        hourly = results['analyses']['hourlyTraffic']
+        self.assertEqual([h['hour'] for h in hourly if h['count']], [11])
+
+    def test_large_size_is_not_truncated(self):
+        entries = parse_lines(['ip,path,status,size', '10.0.0.1,/iso,200,5000000000'])
+        results = InProcessLogAnalyzer().run_analyses(entries, ['bandwidth'])
+
+        self.assertEqual(results['analyses']['bandwidth']['totalBytes'], 5000000000)
+
+    def test_out_of_range_status_maps_to_zero(self):
+        entries = parse_lines([
+            'ip,path,status,size',
+            '10.0.0.1,/a,70000,10',
+            '10.0.0.2,/b,' + '9' * 30 + ',10',
+            '10.0.0.3,/c,404,10',
+        ])
+        results = InProcessLogAnalyzer().run_analyses(entries, ['status-codes'])
+
+        self.assertEqual(results['analyses']['statusCodes'], [
+            {'status': 0, 'count': 2}, {'status': 404, 'count': 1},
+        ])
+
+    def test_filter_matching_nothing(self):
+        entries = parse_lines(['ip,path,status,size', '10.0.0.1,/a,200,10'])
+        results = InProcessLogAnalyzer().run_analyses(entries, ALL_ANALYSES, {'urlPattern': '^/none'})
+
+        self.assertEqual(results['filteredRecords'], 0)
+        self.assertEqual(results['analyses']['uniqueIps'], {'count': 0, 'topIps': []})
+        self.assertEqual(results['analyses']['bandwidth']['totalBytes'], 0)
+
+    def test_analyses_share_per_key_aggregates(self):
+        entries = parse_lines(['ip,path,status,size', '10.0.0.1,/a,200,10', '10.0.0.2,/a,200,5'])
+        analyzer = InProcessLogAnalyzer()
+        with mock.patch.object(analyzer, '_aggregate_by', wraps=analyzer._aggregate_by) as aggregate_by:
+            results = analyzer.run_analyses(entries, ['top-pages', 'bandwidth'])
+
+        self.assertEqual([c.args[1] for c in aggregate_by.call_args_list], ['path'])
+        self.assertEqual(results['analyses']['topPages'], [{'path': '/a', 'count': 2}])
+        self.assertEqual(results['analyses']['bandwidth']['byPath'], [{'path': '/a', 'bytes': 15}])
+
+
+class UrlPatternTests(SimpleTestCase):
+
+    def test_parse_url_pattern(self):
+        self.assertEqual(parse_url_pattern('^/api$'), ('exact', '/api'))
+        self.assertEqual(parse_url_pattern('^/api'), ('prefix', '/api'))
+        self.assertEqual(parse_url_pattern('/api*'), ('prefix', '/api'))
+        self.assertEqual(parse_url_pattern('.css$'), ('suffix', '.css'))
+        self.assertEqual(parse_url_pattern('api'), ('contains', 'api'))
+
+    def test_in_process_exact_match(self):
+        entries = parse_lines(['ip,path,status,size', '10.0.0.1,/api,200,1', '10.0.0.2,/api/v1,200,1'])
+        results = InProcessLogAnalyzer().run_analyses(entries, ['top-pages'], {'urlPattern': '^/api$'})
+
+        self.assertEqual(results['analyses']['topPages'], [{'path': '/api', 'count': 1}])
+
+    def test_spark_exact_match(self):
+        df = mock.MagicMock()
+        with mock.patch('analyzer.spark_analyzer.F') as functions:
+            path = functions.col.return_value
+            path.__eq__ = mock.MagicMock(return_value='path == /api')
+            SparkLogAnalyzer().apply_filters(df, {'urlPattern': '^/api$'})
+
+        path.__eq__.assert_called_once_with('/api')
+        df.filter.assert_called_once_with('path == /api')
+        path.startswith.assert_not_called()
+        path.endswith.assert_not_called()
+
+
+class CsvParserTests(SimpleTestCase):
+
+    def test_values_are_stripped(self):
+        entries = parse_lines([
+            'timestamp,ip,path,status,size',
+            ' 2024-01-01T10:00:00Z ,10.0.0.1,/x , 404 ,20',
+        ])
+
+        self.assertEqual(entries['path'], ['/x'])
+        self.assertEqual(entries['status'], [404])
+        self.assertIsNotNone(entries['timestamp'][0])
+
+    def test_bad_row_does_not_affect_following_rows(self):
+        lines = [
+            'ip,path,status,size',
+            '10.0.0.1,"/unclosed,200,10',
+            '10.0.0.2,/' + 'a' * 200000 + ',200,10',
+            '10.0.0.3,/ok,200,10',
+        ]
+        errors = []
+        entries = entries_to_columns(iter_parse_log_file(lines, errors))
+
+        self.assertEqual(entries['ip'], ['10.0.0.3'])
+        self.assertEqual(len(errors), 2)
+
+
+class ChunkDecodingTests(SimpleTestCase):
+
+    DATA = 'héllo\n'.encode() * 40 + b'caf\xe9\n' + 'ünï\n'.encode() * 40 + b'tail'
+
+    def test_lines_do_not_depend_on_chunk_size(self):
+        decoded = {
+            tuple(iter_chunk_lines(self.DATA[i:i + n] for i in range(0, len(self.DATA), n)))
+            for n in (1, 3, 64, len(self.DATA))
+        }
+
+        self.assertEqual(len(decoded), 1)
+        lines = decoded.pop()
+        self.assertEqual(lines[0], 'héllo')
+        self.assertEqual(lines[40], 'café')
+        self.assertEqual(lines[41], 'ünï')
+        self.assertEqual(lines[-1], 'tail')
+
+    def test_reread_matches_upload(self):
+        # Invalid byte past the first upload chunk, inside the first mmap window
+        data = 'ünï\n'.encode() * 20000 + b'caf\xe9\n' + 'ünï\n'.encode() * 20000
+        uploaded = list(iter_chunk_lines(
+            data[i:i + UPLOAD_CHUNK_SIZE] for i in range(0, len(data), UPLOAD_CHUNK_SIZE)
+        ))
+
+        with tempfile.NamedTemporaryFile() as tmp:
+            tmp.write(data)
+            tmp.flush()
+            with open_log_file(tmp.name) as f:
+                reread = list(iter_log_file_lines(f))
+
+        self.assertTrue(reread == uploaded, 'reread decoded differently from upload')
+        self.assertEqual(uploaded[-1], 'ünï')
+
+
+class RunAnalysisViewTests(TestCase):
+
+    def test_enqueue_failure_marks_job_failed(self):
+        uploaded_file = UploadedFile.objects.create(
+            filename='access.log', file_path='/nonexistent', file_size=0
+        )
+        with mock.patch('analyzer.views.run_log_analysis.delay', side_effect=ConnectionError('broker down')):
+            response = self.client.post(
+                '/api/analyze/',
+                {'fileId': str(uploaded_file.id), 'selectedAnalyses': ['status-codes']},
+                content_type='application/json',
+            )
+
+        self.assertEqual(response.status_code, 503)
+        job = AnalysisJob.objects.get()
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('broker down', job.error_message)
+
+
+class PreviewViewTests(SimpleTestCase):
+
+    def test_invalid_pagination_is_rejected(self):
+        for query in ('page=0', 'page=-1', 'page=abc', 'limit=0', 'limit=100000'):
+            with self.subTest(query=query):
+                response = self.client.get(f'/api/preview/some-file/?{query}')
+                self.assertEqual(response.status_code, 400)
+
+
+class ListResultsViewTests(TestCase):
+
+    def test_invalid_pagination_is_rejected(self):
+        for query in ('page=0', 'page=abc', 'limit=0', 'limit=100000'):
+            with self.subTest(query=query):
+                response = self.client.get(f'/api/results/?{query}')
+                self.assertEqual(response.status_code, 400)
+
+
+@unittest.skipUnless(fakeredis, 'fakeredis is not installed')
+class EntriesCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        server = fakeredis.FakeServer()
+        patcher = mock.patch.object(cache, 'get_client', lambda: fakeredis.FakeRedis(server=server))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def columns(self, ips):
+        return {
+            'ip': ips, 'timestamp': [None] * len(ips), 'method': ['GET'] * len(ips),
+            'path': ['/'] * len(ips), 'protocol': ['HTTP/1.1'] * len(ips),
+            'status': [200] * len(ips), 'size': [1] * len(ips),
+        }
+
+    def test_concurrent_writers_publish_complete_lists(self):
+        def ips_with_second_writer():
+            # Another miss on the same file caches it between our batches
+            yield '10.0.0.1'
+            cache.set_entries('f', self.columns(['10.0.0.9']))
+            yield '10.0.0.2'
+            yield '10.0.0.3'
+
+        with mock.patch.object(cache, 'PUSH_BATCH_SIZE', 1):
+            columns = self.columns(['10.0.0.1', '10.0.0.2', '10.0.0.3'])
+            columns['ip'] = ips_with_second_writer()
+            cache.set_entries('f', columns)
+
+        self.assertEqual(cache.get_entries('f')['ip'], ['10.0.0.1', '10.0.0.2', '10.0.0.3'])
+        self.assertEqual(cache.get_page('f', 0, 2)[1], 3)
@@ -1,13 +1,14 @@
 """API views for the WebLog Analyzer."""
 
-import json
+import hashlib
 import os
-import uuid
 from datetime import datetime
 from pathlib import Path
 
+import orjson
 from django.conf import settings
-from django.http import FileResponse, JsonResponse
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, JsonResponse
+from django.utils.http import parse_etags, quote_etag
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from rest_framework.decorators import api_view, parser_classes
@@ -15,26 +16,54 @@ from rest_framework.parsers import MultiPartParser, JSONParser
 from rest_framework.response import Response
 from rest_framework import status
 
-from .models import UploadedFile, AnalysisJob, AnalysisResult
-from .log_parser import parse_log_file, ParsedLogEntry
-from .spark_analyzer import SparkLogAnalyzer, save_results_to_csv
+from .models import UploadedFile, AnalysisJob, uuid7
+from .log_parser import (
+    columns_to_rows, entries_to_columns, iter_chunk_lines, iter_parse_log_file,
+)
+from .tasks import run_log_analysis
+from . import cache
 
 
-# In-memory storage for parsed data (for demo - use Redis/DB in production)
-PARSED_DATA_CACHE = {}
+# Uploads are read, parsed and written to disk this many bytes at a time
+UPLOAD_CHUNK_SIZE = 64 * 1024
 
+# Largest accepted upload
+MAX_UPLOAD_SIZE = 100 * 1024 * 1024  # 100MB
 
-def entry_to_dict(entry: ParsedLogEntry) -> dict:
-    """Convert ParsedLogEntry to dictionary."""
-    return {
-        'ip': entry.ip,
-        'timestamp': entry.timestamp.isoformat() if entry.timestamp else None,
-        'method': entry.method,
-        'path': entry.path,
-        'protocol': entry.protocol,
-        'status': entry.status,
-        'size': entry.size,
-    }
+# Most entries returned on one page of a file preview
+MAX_PREVIEW_PAGE_SIZE = 1000
+
+# Most results returned on one page of the results history
+MAX_RESULTS_PAGE_SIZE = 200
+
+
+def _parse_pagination(request, default_limit: int, max_limit: int):
+    """
+    Return (page, limit) from the query string, or None unless page is at
+    least 1 and limit is between 1 and max_limit.
+    """
+    try:
+        page = int(request.GET.get('page', 1))
+        limit = int(request.GET.get('limit', default_limit))
+    except ValueError:
+        return None
+    if page < 1 or not 1 <= limit <= max_limit:
+        return None
+    return page, limit
+
+
+def _pagination_error(max_limit: int) -> Response:
+    return Response(
+        {'error': f'page must be at least 1 and limit between 1 and {max_limit}'},
+        status=status.HTTP_400_BAD_REQUEST
+    )
+
+
+def _tee_chunks(upload, dest):
+    """Yield the upload's raw chunks, writing each one to ``dest`` on the way."""
+    for chunk in upload.chunks(UPLOAD_CHUNK_SIZE):
+        dest.write(chunk)
+        yield chunk
 
 
 @api_view(['GET'])
@@ -73,8 +102,16 @@ def upload_file(request):
     
     logger.info(f"Upload request for file: {file.name}, size: {file.size if hasattr(file, 'size') else 'unknown'}")
     
+    # Reject oversized uploads before touching their content
+    if file.size and file.size > MAX_UPLOAD_SIZE:
+        logger.warning(f"File too large: {file.size} bytes")
+        return Response(
+            {'error': 'File too large. Maximum size is 100MB'},
+            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+    
     # Validate file type - only .txt and .log files
-    if not any(filename.endswith(ext) for ext in ['.txt', '.log']):
+    if not filename.endswith(('.txt', '.log')):
         logger.warning(f"Invalid file type: {filename}")
         return Response(
             {'error': 'Only TXT and LOG files are supported'},
@@ -82,57 +119,45 @@ def upload_file(request):
         )
     
     try:
-        # Read file content - handle large files and encoding
-        # Django file uploads can only be read once, so read it completely first
+        if not file.size:
+            logger.warning("Uploaded file content is None or empty")
+            return Response(
+                {'error': 'File is empty or could not be read'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        file_id = str(uuid7())
+        file_path = Path(settings.MEDIA_ROOT) / f"{file_id}_{file.name}"
+        
+        # Single pass over the upload: each chunk is written to the media
+        # directory and decoded into lines for the parser, so memory stays
+        # O(chunk) rather than holding the file as one string
+        errors = []
         try:
-            # Read the entire file content
-            file_content = file.read()
-            
-            # Handle bytes vs string
-            if isinstance(file_content, bytes):
-                # Try UTF-8 first, fallback to latin-1
-                try:
-                    content = file_content.decode('utf-8', errors='ignore')
-                except (UnicodeDecodeError, AttributeError):
-                    content = file_content.decode('latin-1', errors='ignore')
-            else:
-                # Already a string
-                content = str(file_content)
-                
+            with open(file_path, 'wb') as dest:
+                lines = iter_chunk_lines(_tee_chunks(file, dest))
+                columns = entries_to_columns(iter_parse_log_file(lines, errors))
+            valid_rows = len(columns['ip'])
         except Exception as e:
             logger.error(f"Error reading file: {str(e)}", exc_info=True)
+            file_path.unlink(missing_ok=True)
             return Response(
                 {'error': f'Error reading file: {str(e)}'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        if not content:
-            logger.warning("Uploaded file content is None or empty")
-            return Response(
-                {'error': 'File is empty or could not be read'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        if not valid_rows:
+            file_path.unlink(missing_ok=True)
         
         # Check if content is just whitespace
-        if len(content.strip()) == 0:
+        if not valid_rows and errors == ['Empty file']:
             logger.warning("Uploaded file contains only whitespace")
             return Response(
                 {'error': 'File is empty (contains only whitespace)'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Limit file size to prevent memory issues
-        if len(content) > 100 * 1024 * 1024:  # 100MB limit
-            logger.warning(f"File too large: {len(content)} bytes")
-            return Response(
-                {'error': 'File too large. Maximum size is 100MB'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Parse log file
-        entries, errors = parse_log_file(content)
-        
-        if not entries:
+        if not valid_rows:
             logger.warning(f"No valid log entries found. Errors: {len(errors)}")
             return Response(
                 {
@@ -147,36 +172,28 @@ def upload_file(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Save file metadata
-        file_id = str(uuid.uuid4())
-        
-        # Store in media directory
-        file_path = Path(settings.MEDIA_ROOT) / f"{file_id}_{file.name}"
-        with open(file_path, 'w') as f:
-            f.write(content)
-        
         # Save to database
         uploaded_file = UploadedFile.objects.create(
             id=file_id,
             filename=file.name,
             file_path=str(file_path),
             file_size=file.size,
-            total_rows=len(entries) + len(errors),
-            valid_rows=len(entries),
+            total_rows=valid_rows + len(errors),
+            valid_rows=valid_rows,
             error_rows=len(errors),
         )
         
         # Cache parsed data
-        PARSED_DATA_CACHE[file_id] = [entry_to_dict(e) for e in entries]
+        cache.set_entries(file_id, columns)
         
         return Response({
             'fileId': file_id,
             'filename': file.name,
-            'totalRows': len(entries) + len(errors),
-            'validRows': len(entries),
+            'totalRows': valid_rows + len(errors),
+            'validRows': valid_rows,
             'errorRows': len(errors),
             'errors': errors[:20],  # Return first 20 errors
-            'message': f'Successfully parsed {len(entries)} entries'
+            'message': f'Successfully parsed {valid_rows} entries'
         })
         
     except Exception as e:
@@ -192,46 +209,45 @@ def upload_file(request):
 def preview_data(request, file_id):
     """
     Get paginated preview of parsed data.
-    Query params: page (default 1), limit (default 100)
+    Query params: page (default 1), limit (default 100, at most MAX_PREVIEW_PAGE_SIZE)
     """
-    if file_id not in PARSED_DATA_CACHE:
-        # Try to reload from database
+    # Pagination
+    pagination = _parse_pagination(request, 100, MAX_PREVIEW_PAGE_SIZE)
+    if pagination is None:
+        return _pagination_error(MAX_PREVIEW_PAGE_SIZE)
+    page, limit = pagination
+    
+    start_idx = (page - 1) * limit
+    end_idx = start_idx + limit
+    
+    # Fetch only the requested page from the cache
+    cached = cache.get_page(file_id, start_idx, end_idx)
+    if cached is not None:
+        paginated_data, total = cached
+    else:
         try:
-            uploaded_file = UploadedFile.objects.get(id=file_id)
-            with open(uploaded_file.file_path, 'r') as f:
-                content = f.read()
-            entries, _ = parse_log_file(content)
-            PARSED_DATA_CACHE[file_id] = [entry_to_dict(e) for e in entries]
+            columns = cache.load_entries(file_id)
         except (UploadedFile.DoesNotExist, FileNotFoundError):
             return Response(
                 {'error': 'File not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
-    
-    data = PARSED_DATA_CACHE[file_id]
-    
-    # Pagination
-    page = int(request.GET.get('page', 1))
-    limit = int(request.GET.get('limit', 100))
-    
-    start_idx = (page - 1) * limit
-    end_idx = start_idx + limit
-    
-    paginated_data = data[start_idx:end_idx]
+        paginated_data = columns_to_rows(columns, start_idx, end_idx)
+        total = len(columns['ip'])
     
     return Response({
         'data': paginated_data,
-        'total': len(data),
+        'total': total,
         'page': page,
         'limit': limit,
-        'totalPages': (len(data) + limit - 1) // limit
+        'totalPages': (total + limit - 1) // limit
     })
 
 
 @api_view(['POST'])
 def run_analysis(request):
     """
-    Run selected analyses on uploaded data.
+    Queue selected analyses on uploaded data.
     Request body: {
         fileId: string,
         selectedAnalyses: string[],
@@ -256,68 +272,37 @@ def run_analysis(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Get parsed data
-        if file_id not in PARSED_DATA_CACHE:
-            try:
-                uploaded_file = UploadedFile.objects.get(id=file_id)
-                with open(uploaded_file.file_path, 'r') as f:
-                    content = f.read()
-                entries, _ = parse_log_file(content)
-                PARSED_DATA_CACHE[file_id] = [entry_to_dict(e) for e in entries]
-            except (UploadedFile.DoesNotExist, FileNotFoundError):
-                return Response(
-                    {'error': 'File not found'},
-                    status=status.HTTP_404_NOT_FOUND
-                )
-        
-        entries = PARSED_DATA_CACHE[file_id]
+        try:
+            uploaded_file = UploadedFile.objects.get(id=file_id)
+        except UploadedFile.DoesNotExist:
+            return Response(
+                {'error': 'File not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
         
-        # Create analysis job
-        uploaded_file = UploadedFile.objects.get(id=file_id)
+        # Queue the job and return at once; clients poll job_status
         job = AnalysisJob.objects.create(
             uploaded_file=uploaded_file,
             selected_analyses=selected_analyses,
             filters=filters,
-            status='running'
+            status='pending'
         )
-        
         try:
-            # Run Spark analysis
-            analyzer = SparkLogAnalyzer()
-            results = analyzer.run_analyses(entries, selected_analyses, filters)
-            analyzer.stop()
-            
-            # Save results to CSV
-            csv_paths = save_results_to_csv(results, str(job.id))
-            
-            # Update job status
-            job.status = 'completed'
-            job.records_processed = results['filteredRecords']
-            job.result_path = csv_paths.get('json', '')
-            job.completed_at = datetime.now()
-            job.save()
-            
-            # Save individual results
-            for analysis_type, result_data in results['analyses'].items():
-                AnalysisResult.objects.create(
-                    job=job,
-                    analysis_type=analysis_type,
-                    result_data=result_data,
-                    csv_path=csv_paths.get(analysis_type, '')
-                )
-            
-            return Response({
-                'jobId': str(job.id),
-                'status': 'completed',
-                'results': results,
-                'csvPaths': csv_paths
-            })
-            
+            run_log_analysis.delay(str(job.id))
         except Exception as e:
+            # Nothing will ever pick the job up, so don't leave it pending
             job.status = 'failed'
-            job.error_message = str(e)
-            job.save()
-            raise
+            job.error_message = f'Could not queue analysis: {str(e)}'
+            job.save(update_fields=['status', 'error_message'])
+            return Response(
+                {'error': 'Analysis queue is unavailable, please try again later', 'jobId': str(job.id)},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        
+        return Response(
+            {'jobId': str(job.id), 'status': job.status},
+            status=status.HTTP_202_ACCEPTED
+        )
         
     except Exception as e:
         return Response(
@@ -336,6 +321,7 @@ def job_status(request, job_id):
             'status': job.status,
             'progress': job.progress,
             'recordsProcessed': job.records_processed,
+            'resultId': str(job.id) if job.status == 'completed' else None,
             'error': job.error_message if job.status == 'failed' else None,
             'createdAt': job.created_at.isoformat(),
             'completedAt': job.completed_at.isoformat() if job.completed_at else None
@@ -349,44 +335,76 @@ def job_status(request, job_id):
 
 @api_view(['GET'])
 def list_results(request):
-    """List all analysis results (history)."""
-    try:
-        jobs = AnalysisJob.objects.filter(status='completed').select_related('uploaded_file')
-    except Exception as e:
-        # Database table doesn't exist - return empty list
-        return Response({
-            'results': [],
-            'message': 'Database not initialized. Please run: python manage.py migrate'
-        })
+    """
+    List analysis results (history), newest first.
+    Query params: page (default 1), limit (default 50, at most MAX_RESULTS_PAGE_SIZE)
+    """
+    pagination = _parse_pagination(request, 50, MAX_RESULTS_PAGE_SIZE)
+    if pagination is None:
+        return _pagination_error(MAX_RESULTS_PAGE_SIZE)
+    page, limit = pagination
+    offset = (page - 1) * limit
     
-    results = []
-    for job in jobs:
-        results.append({
-            'id': str(job.id),
-            'filename': job.uploaded_file.filename,
-            'selectedAnalyses': job.selected_analyses,
-            'filters': job.filters,
-            'recordsProcessed': job.records_processed,
-            'createdAt': job.created_at.isoformat(),
-            'completedAt': job.completed_at.isoformat() if job.completed_at else None
-        })
+    key = cache.results_page_key(page, limit)
+    results = cache.get_json(key)
+    if results is None:
+        # Load only the listed columns and stream rows from the cursor in
+        # chunks rather than materializing the whole result set first
+        jobs = (
+            AnalysisJob.objects.filter(status='completed')
+            .select_related('uploaded_file')
+            .only(
+                'id', 'selected_analyses', 'filters', 'records_processed',
+                'created_at', 'completed_at', 'uploaded_file__filename',
+            )
+            .order_by('-created_at')[offset:offset + limit]
+        )
+        try:
+            results = []
+            for job in jobs.iterator(chunk_size=500):
+                results.append({
+                    'id': str(job.id),
+                    'filename': job.uploaded_file.filename,
+                    'selectedAnalyses': job.selected_analyses,
+                    'filters': job.filters,
+                    'recordsProcessed': job.records_processed,
+                    'createdAt': job.created_at.isoformat(),
+                    'completedAt': job.completed_at.isoformat() if job.completed_at else None
+                })
+        except Exception as e:
+            # Database table doesn't exist - return empty list
+            return Response({
+                'results': [],
+                'message': 'Database not initialized. Please run: python manage.py migrate'
+            })
+        cache.set_json(key, results, cache.RESULTS_PAGE_TTL)
     
-    return Response({'results': results})
+    return Response({'results': results, 'page': page, 'limit': limit})
 
 
 @api_view(['GET'])
 def get_result(request, result_id):
     """Get detailed results for a specific job."""
     try:
-        job = AnalysisJob.objects.get(id=result_id)
+        job = AnalysisJob.objects.select_related('uploaded_file').get(id=result_id)
+        
+        # A completed job never changes, so clients and proxies may keep it;
+        # a matching If-None-Match is answered before any file is read
+        etag = None
+        if job.status == 'completed':
+            etag = quote_etag(hashlib.md5(f"{job.id}:{job.completed_at}".encode()).hexdigest())
+            if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+                response = HttpResponseNotModified()
+                response['ETag'] = etag
+                return response
         
         # Load results from JSON file
         if job.result_path and os.path.exists(job.result_path):
-            with open(job.result_path, 'r') as f:
-                results = json.load(f)
+            with open(job.result_path, 'rb') as f:
+                results = orjson.loads(f.read())
         else:
             # Reconstruct from database
-            analysis_results = job.results.all()
+            analysis_results = job.results.only('analysis_type', 'result_data').iterator(chunk_size=500)
             results = {
                 'timestamp': job.completed_at.isoformat() if job.completed_at else job.created_at.isoformat(),
                 'totalRecords': job.uploaded_file.valid_rows,
@@ -394,13 +412,17 @@ def get_result(request, result_id):
                 'analyses': {r.analysis_type: r.result_data for r in analysis_results}
             }
         
-        return Response({
+        response = Response({
             'jobId': str(job.id),
             'filename': job.uploaded_file.filename,
             'selectedAnalyses': job.selected_analyses,
             'filters': job.filters,
             'results': results
         })
+        if etag:
+            response['ETag'] = etag
+            response['Cache-Control'] = 'public, max-age=86400, immutable'
+        return response
         
     except AnalysisJob.DoesNotExist:
         return Response(
@@ -434,16 +456,24 @@ def download_result(request, result_id):
         filename = file_map.get(analysis_type, 'results.json')
         file_path = results_dir / filename
         
-        if not file_path.exists():
+        try:
+            size = file_path.stat().st_size
+        except FileNotFoundError:
             return Response(
                 {'error': 'File not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        response = FileResponse(
-            open(file_path, 'rb'),
-            content_type='text/csv' if filename.endswith('.csv') else 'application/json'
-        )
+        content_type = 'text/csv' if filename.endswith('.csv') else 'application/json'
+        if settings.RESULTS_ACCEL_REDIRECT_PREFIX:
+            # nginx serves the file itself with sendfile(); Django only
+            # resolves and authorizes the path
+            response = HttpResponse(content_type=content_type)
+            response['X-Accel-Redirect'] = f"{settings.RESULTS_ACCEL_REDIRECT_PREFIX}/{result_id}/{filename}"
+        else:
+            # A real file object lets the WSGI server use wsgi.file_wrapper
+            response = FileResponse(open(file_path, 'rb'), content_type=content_type)
+            response['Content-Length'] = str(size)
         response['Content-Disposition'] = f'attachment; filename="{filename}"'
         return response
         
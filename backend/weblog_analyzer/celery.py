@@ -0,0 +1,11 @@
+"""Celery application for running analysis jobs in background workers."""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'weblog_analyzer.settings')
+
+app = Celery('weblog_analyzer')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
@@ -89,7 +89,7 @@ CORS_ALLOW_ALL_ORIGINS = DEBUG
 # REST Framework Settings
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'analyzer.renderers.ORJSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
@@ -111,3 +111,21 @@ RESULTS_DIR.mkdir(exist_ok=True)
 # Spark Configuration
 SPARK_MASTER = os.environ.get('SPARK_MASTER', 'local[*]')
 SPARK_APP_NAME = 'WebLogAnalyzer'
+
+# Inputs with fewer valid rows than this are analyzed in-process with polars
+SPARK_MIN_ROWS = int(os.environ.get('SPARK_MIN_ROWS', 500000))
+
+# Redis cache for parsed uploads; run the instance with
+# maxmemory-policy allkeys-lru so it evicts instead of refusing writes
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+PARSED_CACHE_TTL = int(os.environ.get('PARSED_CACHE_TTL', 3600))
+
+# Celery runs analysis jobs off the request thread; set
+# CELERY_TASK_ALWAYS_EAGER=True to run them inline without a worker
+CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', REDIS_URL)
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_TASK_ALWAYS_EAGER = os.environ.get('CELERY_TASK_ALWAYS_EAGER', 'False').lower() == 'true'
+
+# When set (e.g. '/protected-results'), downloads are handed to nginx via
+# X-Accel-Redirect to an internal location aliased to RESULTS_DIR
+RESULTS_ACCEL_REDIRECT_PREFIX = os.environ.get('RESULTS_ACCEL_REDIRECT_PREFIX', '')